@@ -1,15 +1,65 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any
-from openpyxl import Workbook,load_workbook
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, Alignment
-from io import BytesIO
+from fastapi.concurrency import run_in_threadpool
+from fastapi.openapi.utils import get_openapi
+import msgspec
+from typing import List, Dict, Any, Optional, Annotated
+from python_calamine import CalamineWorkbook, CalamineError
+import re
+import math
+import zipfile
+from zipfile import ZipFile, ZIP_DEFLATED, BadZipFile
+from isal import isal_zlib
+from xml.sax.saxutils import escape, quoteattr
+from xml.etree import ElementTree
+import posixpath
+from itertools import takewhile
+from tempfile import SpooledTemporaryFile
 from fastapi.responses import StreamingResponse, JSONResponse
+import orjson
+import logging
+from datetime import timedelta
+
+def orjson_default(value: Any):
+    """
+    Convierte los valores que orjson no serializa por sí mismo.
+    Las duraciones (celdas con formato [h]:mm) se devuelven en segundos, igual que jsonable_encoder de FastAPI.
+    """
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    raise TypeError(f"Tipo de dato no soportado: {type(value).__name__}.")
+
+class OrjsonResponse(JSONResponse):
+    """
+    Respuesta JSON serializada con orjson, mucho más rápido que json de la librería estándar
+    con muchas filas y que además convierte fechas y horas a ISO 8601.
+    """
+    def render(self, content: Any) -> bytes:
+        # OPT_NON_STR_KEYS permite encabezados numéricos como claves, igual que json
+        return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+# zipfile comprime con zlib; isal_zlib tiene la misma interfaz y usa el deflate de ISA-L (SIMD),
+# varias veces más rápido al comprimir el XML de las hojas
+zipfile.zlib = isal_zlib
+zipfile.crc32 = isal_zlib.crc32
 
 app = FastAPI()
 
+# Registro de los errores no previstos, junto con los del servidor
+logger = logging.getLogger("uvicorn.error")
+
+# Errores no previstos: se responde un 500 genérico sin exponer detalles internos
+# y se registra la traza completa del error
+# Se atienden en un middleware registrado antes que CORS para que la respuesta también lleve sus encabezados
+# (un manejador de Exception corre fuera de CORSMiddleware)
+@app.middleware("http")
+async def unexpected_error_middleware(request: Request, call_next):
+    try:
+        return await call_next(request)
+    except Exception:
+        logger.exception("Error no previsto en %s %s", request.method, request.url.path)
+        return JSONResponse(status_code=500, content={"detail": "Error interno del servidor."})
+
 # Configuración de CORS para permitir todos los orígenes
 app.add_middleware(
     CORSMiddleware,
@@ -19,164 +69,587 @@ app.add_middleware(
     allow_headers=["*"],            # Permitir todos los encabezados
 )
 
-# Definición de los modelos Pydantic para validar el JSON de entrada
-class SheetData(BaseModel):
-    hoja: str = Field(..., example="Reporte1")
-    title: str = Field(..., example="Reporte de Ventas")
-    column_widths: Dict[str, float] = Field(..., example={"Producto": 20, "Cantidad": 15, "Precio": 15})
-    data: List[Dict[str, Any]] = Field(..., example=[
+# Definición de los modelos para validar el JSON de entrada
+# msgspec decodifica y valida el JSON en C directamente a estas estructuras, sin diccionarios intermedios
+# Los ejemplos de msgspec.Meta aparecen en la documentación de OpenAPI
+class SheetData(msgspec.Struct):
+    hoja: Annotated[str, msgspec.Meta(examples=["Reporte1"])]
+    title: Annotated[str, msgspec.Meta(examples=["Reporte de Ventas"])]
+    column_widths: Annotated[Dict[str, float], msgspec.Meta(examples=[{"Producto": 20, "Cantidad": 15, "Precio": 15}])]
+    data: Annotated[List[Dict[str, Any]], msgspec.Meta(examples=[[
         {"Producto": "Manzanas", "Cantidad": 50, "Precio": 1.5},
         {"Producto": "Naranjas", "Cantidad": 30, "Precio": 2.0}
-    ])
+    ]])] = []
+    # Alternativa a "data" para hojas grandes: cada fila es una lista de valores en el mismo orden
+    # que column_widths, sin repetir los nombres de columna. Si se envía, se usa en lugar de "data".
+    data_rows: Annotated[Optional[List[List[Any]]], msgspec.Meta(examples=[[["Manzanas", 50, 1.5], ["Naranjas", 30, 2.0]]])] = None
 
-class ExcelRequest(BaseModel):
+class ExcelRequest(msgspec.Struct):
     hojas: List[SheetData]
 
-@app.post("/crear-excel")
-def crear_excel(request: ExcelRequest):
+# Decodificador reutilizable para el cuerpo de /crear-excel
+EXCEL_REQUEST_DECODER = msgspec.json.Decoder(ExcelRequest)
+
+# Esquema JSON de ExcelRequest para documentar el cuerpo de /crear-excel, que FastAPI no valida
+(EXCEL_REQUEST_SCHEMA,), EXCEL_REQUEST_COMPONENTS = msgspec.json.schema_components(
+    (ExcelRequest,), ref_template="#/components/schemas/{name}"
+)
+
+
+def custom_openapi():
+    """
+    Esquema OpenAPI de la aplicación con los modelos de msgspec agregados a los componentes,
+    para que las referencias del cuerpo de /crear-excel apunten a SheetData y ExcelRequest.
+    """
+    if app.openapi_schema:
+        return app.openapi_schema
+    schema = get_openapi(title=app.title, version=app.version, routes=app.routes)
+    schema.setdefault("components", {}).setdefault("schemas", {}).update(EXCEL_REQUEST_COMPONENTS)
+    app.openapi_schema = schema
+    return schema
+
+
+app.openapi = custom_openapi
+
+
+# Tamaño máximo que un libro generado ocupa en memoria antes de pasar a disco
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# Tamaño de cada bloque enviado en la respuesta
+CHUNK_SIZE = 64 * 1024
+# Filas de datos que se generan juntas antes de escribirlas en el archivo
+SHEET_ROWS_PER_CHUNK = 1000
+
+# Límite de los enteros que un float representa exactamente
+MAX_EXACT_INT = 2 ** 53
+
+# Espacios de nombres usados al leer el XML de un libro
+SHEET_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+DOC_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+OFFICE_DOCUMENT_REL = DOC_REL_NS + "/officeDocument"
+
+# Partes fijas del paquete xlsx que se arma con las hojas generadas
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{sheets}'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{shared_strings}'
+    '</Types>'
+)
+CONTENT_TYPE_SHARED_STRINGS_XML = '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+CONTENT_TYPE_SHEET_XML = '<Override PartName="/xl/worksheets/sheet{idx}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<bookViews><workbookView/></bookViews>'
+    '<sheets>{sheets}</sheets>'
+    '<definedNames>{filters}</definedNames>'
+    '<calcPr fullCalcOnLoad="1"/>'
+    '</workbook>'
+)
+WORKBOOK_SHEET_XML = '<sheet name={name} sheetId="{idx}" r:id="rId{idx}"/>'
+WORKBOOK_FILTER_XML = '<definedName name="_xlnm._FilterDatabase" localSheetId="{idx}" hidden="1">{ref}</definedName>'
+WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}'
+    '<Relationship Id="rId{styles_id}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '{shared_strings}'
+    '</Relationships>'
+)
+WORKBOOK_SHARED_STRINGS_REL_XML = '<Relationship Id="rId{idx}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>'
+SHARED_STRINGS_HEAD_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" uniqueCount="{count}">'
+)
+WORKBOOK_SHEET_REL_XML = '<Relationship Id="rId{idx}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet{idx}.xml"/>'
+
+# Estilos del libro: 1 título, 2 encabezados, 3 datos (alineación vertical centrada)
+STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="3">'
+    '<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '<font><b/><sz val="14"/><name val="Calibri"/><family val="2"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '</fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1" applyAlignment="1"><alignment horizontal="center" vertical="center" wrapText="1"/></xf>'
+    '<xf numFmtId="0" fontId="2" fillId="0" borderId="0" xfId="0" applyFont="1" applyAlignment="1"><alignment horizontal="center" vertical="center" wrapText="1"/></xf>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0" applyAlignment="1"><alignment horizontal="left" vertical="center" wrapText="1"/></xf>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+TITLE_STYLE = 1
+HEADER_STYLE = 2
+BODY_STYLE = 3
+
+# Partes fijas del XML de cada hoja
+SHEET_HEAD_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<dimension ref="A1:{last_cell}"/>'
+    '<sheetViews><sheetView{tab_selected} workbookViewId="0"/></sheetViews>'
+    '<sheetFormatPr defaultRowHeight="15"/>'
+    '{cols}'
+    '<sheetData>'
+)
+SHEET_COL_XML = '<col min="{idx}" max="{idx}" width="{width}" style="{style}" customWidth="1"/>'
+SHEET_TAIL_XML = (
+    '</sheetData>'
+    '<autoFilter ref="{filter_ref}"/>'
+    '{merge}'
+    '<pageMargins left="0.7" right="0.7" top="0.75" bottom="0.75" header="0.3" footer="0.3"/>'
+    '</worksheet>'
+)
+SHEET_MERGE_XML = '<mergeCells count="1"><mergeCell ref="{ref}"/></mergeCells>'
+
+# Caracteres de control que no pueden ir en XML, Excel los guarda como _xHHHH_
+ILLEGAL_XML_CHARS = re.compile("[\x00-\x08\x0B\x0C\x0E-\x1F]")
+# Caracteres que Excel no admite en el nombre de una hoja
+INVALID_SHEET_NAME_CHARS = re.compile(r"[\[\]:*?/\\]")
+# Referencia de una celda, como "B3" (letras de la columna y número de la fila)
+CELL_REF = re.compile(r"([A-Z]+)([0-9]+)")
+
+def iter_file(file, chunk_size=CHUNK_SIZE):
+    """
+    Lee un archivo por bloques para enviarlo en una respuesta y lo cierra al terminar.
+    """
     try:
-        # Crear un nuevo libro de Excel
-        wb = Workbook()
-        
-        # Si no hay hojas en la solicitud, devolver error
-        if not request.hojas:
-            raise HTTPException(status_code=400, detail="La lista de hojas está vacía.")
-        
-        for idx, sheet in enumerate(request.hojas):
-            # Para la primera hoja, usar la hoja activa
-            if idx == 0:
-                ws = wb.active
-                ws.title = sheet.hoja
-            else:
-                ws = wb.create_sheet(title=sheet.hoja)
-            
-            # Agregar el título
-            ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=len(sheet.column_widths))
-            title_cell = ws.cell(row=1, column=1)
-            title_cell.value = sheet.title
-            title_cell.font = Font(size=14, bold=True)
-            title_cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)  # Alineación vertical centrada
-            
-            # Agregar los encabezados de columna
-            headers = list(sheet.column_widths.keys())
-            for col_num, header in enumerate(headers, 1):
-                cell = ws.cell(row=2, column=col_num)
-                cell.value = header
-                cell.font = Font(bold=True)
-                cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)  # Alineación vertical centrada
-                # Establecer el ancho de la columna
-                ws.column_dimensions[get_column_letter(col_num)].width = sheet.column_widths[header]
-            
-            # Agregar los datos
-            for row_num, row_data in enumerate(sheet.data, start=3):
-                for col_num, header in enumerate(headers, 1):
-                    value = row_data.get(header, "")
-                    cell = ws.cell(row=row_num, column=col_num)
-                    cell.value = value
-                    # Alineación vertical centrada
-                    cell.alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
-            
-            # Habilitar el filtrado automático en las columnas
-            # Determinar el rango de la tabla (desde la primera columna hasta la última, y desde la fila de encabezados hasta la última fila de datos)
-            last_row = ws.max_row
-            last_col = len(headers)
-            start_cell = f"A2"
-            end_cell = f"{get_column_letter(last_col)}{last_row}"
-            ws.auto_filter.ref = f"{start_cell}:{end_cell}"
+        while chunk := file.read(chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+def column_letter(col: int):
+    """
+    Devuelve la letra de una columna de Excel a partir de su número (desde 1).
+    """
+    letters = ""
+    while col:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+# Letras de todas las columnas que admite Excel (A hasta XFD), calculadas una sola vez
+MAX_COLUMNS = 16384
+COLUMN_LETTERS = tuple(column_letter(idx) for idx in range(1, MAX_COLUMNS + 1))
+# Índice (desde 0) de cada letra de columna, para leer las referencias de celda
+COLUMN_INDEXES = {letter: idx for idx, letter in enumerate(COLUMN_LETTERS)}
+
+def text_xml(value: str):
+    """
+    Devuelve el elemento <t> de un texto no vacío, escapado para XML.
+    """
+    text = escape(value)
+    if ILLEGAL_XML_CHARS.search(text):
+        text = ILLEGAL_XML_CHARS.sub(lambda match: f"_x{ord(match.group()):04X}_", text)
+    # Sin xml:space Excel recorta los espacios al inicio y al final
+    if value[0].isspace() or value[-1].isspace():
+        return f'<t xml:space="preserve">{text}</t>'
+    return f'<t>{text}</t>'
+
+def cell_xml(ref: str, style: int, value: Any, shared_strings: Optional[Dict[str, int]] = None):
+    """
+    Devuelve el XML de una celda con su valor y su estilo.
+    Los textos se escriben en línea, salvo que se reciba la tabla de textos compartidos
+    (texto -> índice), en cuyo caso se agregan a ella y la celda solo guarda el índice.
+    """
+    if value is None or value == "":
+        return f'<c r="{ref}" s="{style}"/>'
+    if isinstance(value, str):
+        # Igual que openpyxl, un texto de más de un carácter que empieza con "=" se guarda como fórmula
+        if len(value) > 1 and value[0] == "=":
+            return f'<c r="{ref}" s="{style}"><f>{escape(value[1:])}</f></c>'
+        if shared_strings is not None:
+            return f'<c r="{ref}" s="{style}" t="s"><v>{shared_strings.setdefault(value, len(shared_strings))}</v></c>'
+        return f'<c r="{ref}" s="{style}" t="inlineStr"><is>{text_xml(value)}</is></c>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}" s="{style}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, int):
+        return f'<c r="{ref}" s="{style}"><v>{value}</v></c>'
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError(f"Excel no admite el valor numérico {value} (celda {ref}).")
+        return f'<c r="{ref}" s="{style}"><v>{value!r}</v></c>'
+    raise TypeError(f"Tipo de dato no soportado en la celda {ref}: {type(value).__name__}.")
+
+def sheet_rows(sheet: SheetData):
+    """
+    Devuelve las filas de datos de la hoja como secuencias de valores en el orden de los encabezados.
+    Con data_rows se usan tal cual; con data se extraen de cada diccionario (las claves ausentes quedan en None).
+    """
+    if sheet.data_rows is not None:
+        return sheet.data_rows
+    keys = tuple(sheet.column_widths.keys())
+    return (map(row_data.get, keys) for row_data in sheet.data)
+
+def sheet_row_count(sheet: SheetData):
+    """
+    Cantidad de filas de datos de la hoja.
+    """
+    return len(sheet.data_rows) if sheet.data_rows is not None else len(sheet.data)
+
+def iter_sheet_xml(sheet: SheetData, selected: bool, shared_strings: Optional[Dict[str, int]] = None):
+    """
+    Genera directamente el XML de una hoja por partes: título combinado, encabezados,
+    datos en bloques de SHEET_ROWS_PER_CHUNK filas y filtro automático.
+    Con shared_strings los textos se agregan a esa tabla en lugar de escribirse en línea.
+    """
+    headers = list(sheet.column_widths.keys())
+    letters = COLUMN_LETTERS[:max(len(headers), 1)]
+    last_row = 2 + sheet_row_count(sheet)
+    
+    yield SHEET_HEAD_XML.format(
+        last_cell=f"{letters[-1]}{last_row}",
+        tab_selected=' tabSelected="1"' if selected else "",
+        # Establecer el ancho y el estilo de los datos por columna: las celdas vacías toman la alineación de la columna
+        cols="<cols>{}</cols>".format("".join(
+            SHEET_COL_XML.format(idx=idx, width=sheet.column_widths[header], style=BODY_STYLE)
+            for idx, header in enumerate(headers, 1)
+        )) if headers else "",
+    )
+    
+    # Agregar el título (las demás celdas de la fila quedan combinadas con la primera)
+    title_cells = [cell_xml(f"{letter}1", TITLE_STYLE, None) for letter in letters[1:]]
+    yield f'<row r="1">{cell_xml("A1", TITLE_STYLE, sheet.title, shared_strings)}{"".join(title_cells)}</row>'
+    
+    # Agregar los encabezados de columna
+    header_cells = [cell_xml(f"{letter}2", HEADER_STYLE, header, shared_strings) for letter, header in zip(letters, headers)]
+    yield f'<row r="2">{"".join(header_cells)}</row>'
+    
+    # Agregar los datos
+    # Los encabezados y los métodos se fijan en variables locales para no resolverlos en cada celda
+    # Las celdas vacías no se escriben, el estilo de la columna ya les da su alineación
+    # Cada fila llega como secuencia de valores en el orden de los encabezados (ver sheet_rows)
+    # Solo se mantiene en memoria el bloque de filas actual
+    rows = []
+    append = rows.append
+    for row_num, values in enumerate(sheet_rows(sheet), start=3):
+        cells = "".join([
+            cell_xml(f"{letter}{row_num}", BODY_STYLE, value, shared_strings)
+            for letter, value in zip(letters, values)
+            if value is not None and value != ""
+        ])
+        append(f'<row r="{row_num}">{cells}</row>')
+        if len(rows) == SHEET_ROWS_PER_CHUNK:
+            yield "".join(rows)
+            rows.clear()
+    yield "".join(rows)
+    
+    # Habilitar el filtrado automático en las columnas
+    # Desde la fila de encabezados hasta la última fila de datos
+    yield SHEET_TAIL_XML.format(
+        filter_ref=f"A2:{letters[-1]}{last_row}",
+        merge=SHEET_MERGE_XML.format(ref=f"A1:{letters[-1]}1") if len(letters) > 1 else "",
+    )
+    
+    # Opcional: Ajustar la altura de las filas automáticamente
+    # Nota: Excel ajusta la altura de las filas al abrir el archivo
+    # Por lo tanto, no es necesario establecer la altura manualmente
+
+def build_workbook(hojas: List[SheetData], inline_strings: bool = True):
+    """
+    Construye el libro de Excel con las hojas recibidas y lo devuelve
+    en un archivo temporal posicionado al inicio.
+    Con inline_strings=False los textos van a una tabla de textos compartidos
+    común a todo el libro (cada texto repetido se guarda una sola vez).
+    """
+    # Validar los nombres de hoja con las mismas reglas que Excel
+    # (hasta 31 caracteres, sin []:*?/\, sin comillas simples en los extremos y sin repetir, sin distinguir mayúsculas)
+    names = set()
+    for sheet in hojas:
+        if not sheet.hoja or len(sheet.hoja) > 31:
+            raise ValueError(f"El nombre de hoja '{sheet.hoja}' debe tener entre 1 y 31 caracteres.")
+        if INVALID_SHEET_NAME_CHARS.search(sheet.hoja) or sheet.hoja[0] == "'" or sheet.hoja[-1] == "'":
+            raise ValueError(f"El nombre de hoja '{sheet.hoja}' contiene caracteres no permitidos.")
+        if sheet.hoja.lower() in names:
+            raise ValueError(f"El nombre de hoja '{sheet.hoja}' está repetido.")
+        names.add(sheet.hoja.lower())
+        if len(sheet.column_widths) > MAX_COLUMNS:
+            raise ValueError(f"La hoja '{sheet.hoja}' tiene más de {MAX_COLUMNS} columnas.")
+    
+    shared_strings = None if inline_strings else {}
+    
+    # Armar el paquete del libro con las hojas generadas
+    # Los libros pequeños se quedan en memoria y los grandes pasan a disco
+    # El nivel 1 de compresión es mucho más rápido que el predeterminado y el archivo crece poco
+    buffer = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        with ZipFile(buffer, "w", ZIP_DEFLATED, compresslevel=1) as archive:
+            archive.writestr("[Content_Types].xml", CONTENT_TYPES_XML.format(
+                sheets="".join(CONTENT_TYPE_SHEET_XML.format(idx=idx) for idx in range(1, len(hojas) + 1)),
+                shared_strings="" if inline_strings else CONTENT_TYPE_SHARED_STRINGS_XML,
+            ))
+            archive.writestr("_rels/.rels", ROOT_RELS_XML)
+            archive.writestr("xl/workbook.xml", WORKBOOK_XML.format(
+                sheets="".join(
+                    WORKBOOK_SHEET_XML.format(name=quoteattr(sheet.hoja), idx=idx)
+                    for idx, sheet in enumerate(hojas, 1)
+                ),
+                # Rango del filtro automático de cada hoja, desde los encabezados hasta la última fila de datos
+                filters="".join(
+                    WORKBOOK_FILTER_XML.format(
+                        idx=idx,
+                        ref=escape("'{}'!{}".format(
+                            sheet.hoja.replace("'", "''"),
+                            "$A$2:${}${}".format(COLUMN_LETTERS[max(len(sheet.column_widths), 1) - 1], 2 + sheet_row_count(sheet)),
+                        )),
+                    )
+                    for idx, sheet in enumerate(hojas)
+                ),
+            ))
+            archive.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS_XML.format(
+                sheets="".join(WORKBOOK_SHEET_REL_XML.format(idx=idx) for idx in range(1, len(hojas) + 1)),
+                styles_id=len(hojas) + 1,
+                shared_strings="" if inline_strings else WORKBOOK_SHARED_STRINGS_REL_XML.format(idx=len(hojas) + 2),
+            ))
+            archive.writestr("xl/styles.xml", STYLES_XML)
+            # Cada hoja se escribe directamente en el archivo a medida que se genera, sin guardar su XML completo
+            # Como el tamaño no se conoce de antemano, force_zip64 permite entradas de más de 4 GB
+            # Solo la primera hoja queda seleccionada al abrir el libro
+            for idx, sheet in enumerate(hojas, 1):
+                with archive.open(f"xl/worksheets/sheet{idx}.xml", "w", force_zip64=True) as entry:
+                    for chunk in iter_sheet_xml(sheet, idx == 1, shared_strings):
+                        entry.write(chunk.encode("utf-8"))
             
-            # Opcional: Ajustar la altura de las filas automáticamente
-            # Nota: OpenPyXL no soporta auto ajuste de altura de filas, pero Excel lo hace al abrir el archivo
-            # Por lo tanto, no es necesario establecer la altura manualmente
-
-        # Guardar el libro en un buffer en memoria
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
-        # Preparar la respuesta como un archivo de Excel
-        headers = {
-            'Content-Disposition': 'attachment; filename=archivo_multisheets.xlsx'
-        }
-        return StreamingResponse(
-            buffer,
-            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            headers=headers
-        )
+            # La tabla de textos compartidos se completa al generar todas las hojas
+            if shared_strings is not None:
+                with archive.open("xl/sharedStrings.xml", "w", force_zip64=True) as entry:
+                    entry.write(SHARED_STRINGS_HEAD_XML.format(count=len(shared_strings)).encode("utf-8"))
+                    texts = list(shared_strings)
+                    for start in range(0, len(texts), SHEET_ROWS_PER_CHUNK):
+                        chunk = "".join([f"<si>{text_xml(text)}</si>" for text in texts[start:start + SHEET_ROWS_PER_CHUNK]])
+                        entry.write(chunk.encode("utf-8"))
+                    entry.write(b"</sst>")
+    except BaseException:
+        buffer.close()
+        raise
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    buffer.seek(0)
+    return buffer
 
+@app.post(
+    "/crear-excel",
+    response_class=StreamingResponse,
+    openapi_extra={"requestBody": {"content": {"application/json": {"schema": EXCEL_REQUEST_SCHEMA}}, "required": True}},
+)
+async def crear_excel(request: Request, inline_strings: bool = True):
+    # Leer el cuerpo crudo y decodificarlo con msgspec en lugar de la validación de FastAPI
+    try:
+        payload = EXCEL_REQUEST_DECODER.decode(await request.body())
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    # Si no hay hojas en la solicitud, devolver error
+    if not payload.hojas:
+        raise HTTPException(status_code=400, detail="La lista de hojas está vacía.")
+    
+    # Construir el libro en un hilo aparte para no bloquear el event loop
+    # Los datos que Excel no admite (nombres de hoja, valores no soportados) son errores de la solicitud
+    # Cualquier otro error lo atiende el manejador global
+    try:
+        buffer = await run_in_threadpool(build_workbook, payload.hojas, inline_strings)
+    except (KeyError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Preparar la respuesta como un archivo de Excel
+    headers = {
+        'Content-Disposition': 'attachment; filename=archivo_multisheets.xlsx'
+    }
+    return StreamingResponse(
+        iter_file(buffer),
+        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        headers=headers
+    )
+
+
+
+def sheet_paths(archive: ZipFile):
+    """
+    Ubica el XML de cada hoja a partir de las relaciones del paquete.
+    Devuelve un diccionario {nombre de hoja: ruta dentro del archivo} con las hojas que existen.
+    """
+    # Ubicar el libro principal a partir de las relaciones del paquete
+    workbook_path = "xl/workbook.xml"
+    for rel in ElementTree.fromstring(archive.read("_rels/.rels")).iter(f"{{{PKG_REL_NS}}}Relationship"):
+        if rel.get("Type") == OFFICE_DOCUMENT_REL:
+            workbook_path = rel.get("Target").lstrip("/")
+            break
+    workbook_dir = posixpath.dirname(workbook_path)
+    rels_path = posixpath.join(workbook_dir, "_rels", posixpath.basename(workbook_path) + ".rels")
+    
+    # Relacionar cada identificador de relación con la ruta de su hoja
+    targets = {}
+    for rel in ElementTree.fromstring(archive.read(rels_path)).iter(f"{{{PKG_REL_NS}}}Relationship"):
+        target = rel.get("Target")
+        if target.startswith("/"):
+            targets[rel.get("Id")] = target.lstrip("/")
+        else:
+            targets[rel.get("Id")] = posixpath.normpath(posixpath.join(workbook_dir, target))
+    
+    paths = {}
+    for sheet in ElementTree.fromstring(archive.read(workbook_path)).iter(f"{{{SHEET_NS}}}sheet"):
+        sheet_path = targets.get(sheet.get(f"{{{DOC_REL_NS}}}id"))
+        if sheet_path in archive.NameToInfo:
+            paths[sheet.get("name")] = sheet_path
+    return paths
+
+def read_column_widths(archive: ZipFile, sheet_path: str):
+    """
+    Lee los anchos de columna de una hoja directamente de su XML.
+    Devuelve un diccionario {número de columna (desde 1): ancho}.
+    """
+    widths = {}
+    with archive.open(sheet_path) as sheet_xml:
+        # Los <col> van antes de <sheetData>, no hace falta leer las filas
+        for event, element in ElementTree.iterparse(sheet_xml, events=("start",)):
+            if element.tag == f"{{{SHEET_NS}}}sheetData":
+                break
+            if element.tag == f"{{{SHEET_NS}}}col" and element.get("width"):
+                width = float(element.get("width"))
+                for col in range(int(element.get("min")), int(element.get("max")) + 1):
+                    widths[col] = width
+    return widths
+
+def read_error_cells(archive: ZipFile, sheet_path: str):
+    """
+    Lee las celdas con error (#N/A, #DIV/0!, ...) de una hoja directamente de su XML,
+    ya que calamine las devuelve vacías. Devuelve un diccionario
+    {índice de fila (desde 0): {índice de columna (desde 0): texto del error}}.
+    """
+    # Solo se recorren las celdas si el XML tiene alguna celda de error (t="e")
+    with archive.open(sheet_path) as sheet_xml:
+        tail = b""
+        while chunk := sheet_xml.read(CHUNK_SIZE):
+            data = tail + chunk
+            if b't="e"' in data or b"t='e'" in data:
+                break
+            # Conservar el final del bloque por si la marca queda partida entre dos bloques
+            tail = data[-4:]
+        else:
+            return {}
+    
+    errors = {}
+    with archive.open(sheet_path) as sheet_xml:
+        for event, element in ElementTree.iterparse(sheet_xml):
+            if element.tag == f"{{{SHEET_NS}}}c" and element.get("t") == "e":
+                match = CELL_REF.fullmatch(element.get("r") or "")
+                value = element.find(f"{{{SHEET_NS}}}v")
+                if match and value is not None:
+                    row_idx = int(match.group(2)) - 1
+                    errors.setdefault(row_idx, {})[COLUMN_INDEXES[match.group(1)]] = value.text
+            elif element.tag == f"{{{SHEET_NS}}}row":
+                # Liberar las filas ya leídas
+                element.clear()
+    return errors
 
+def apply_error_cells(rows, errors: Dict[int, Dict[int, str]]):
+    """
+    Coloca el texto de las celdas con error en las filas leídas por calamine.
+    """
+    for row_idx, row in enumerate(rows):
+        for col_idx, text in errors.get(row_idx, {}).items():
+            if col_idx < len(row):
+                row[col_idx] = text
+        yield row
 
-@app.post("/excel-a-json")
+def normalize_row(row: List[Any]):
+    """
+    Ajusta los valores de una fila de calamine a los que devolvía openpyxl:
+    las celdas vacías llegan como "" y se devuelven como None, y los números
+    enteros llegan como float y se devuelven como int. Los enteros desde 2**53
+    se dejan como float, igual que openpyxl (y orjson no admite enteros de más de 64 bits).
+    """
+    return [
+        None if value == "" else
+        int(value) if type(value) is float and value.is_integer() and -MAX_EXACT_INT < value < MAX_EXACT_INT else
+        value
+        for value in row
+    ]
+
+@app.post("/excel-a-json", response_class=OrjsonResponse)
 async def excel_a_json(file: UploadFile = File(...)):
     """
     Endpoint inverso que recibe un archivo Excel y devuelve un JSON
     con la misma estructura que la clase ExcelRequest.
     """
+    # Verificar que el contenido sea un archivo de Excel
+    if not (file.filename or "").endswith(('.xlsx', '.xlsm')):
+        raise HTTPException(status_code=400, detail="El archivo proporcionado no es un Excel válido.")
+    
     try:
-        # Verificar que el contenido sea un archivo de Excel
-        if not file.filename.endswith(('.xlsx', '.xlsm')):
-            raise HTTPException(status_code=400, detail="El archivo proporcionado no es un Excel válido.")
-
-        # Cargar el archivo en memoria
-        contents = await file.read()
+        # Usar directamente el archivo temporal en el que FastAPI ya recibió la subida
+        # (se queda en memoria si es pequeño y pasa a disco si es grande), sin copiarlo a bytes
+        await file.seek(0)
         
-        # Cargar el libro de Excel con openpyxl
-        wb = load_workbook(filename=BytesIO(contents), data_only=True)
+        # Cargar el libro de Excel con calamine (lector en Rust, devuelve los valores calculados)
+        wb = CalamineWorkbook.from_filelike(file.file)
+        
+        # calamine no expone los anchos de columna ni el texto de las celdas con error, se leen del archivo
+        await file.seek(0)
+        with ZipFile(file.file) as archive:
+            paths = sheet_paths(archive)
+            widths_by_sheet = {name: read_column_widths(archive, path) for name, path in paths.items()}
+            errors_by_sheet = {name: read_error_cells(archive, path) for name, path in paths.items()}
         
         # Estructura final a retornar
         hojas_data = []
 
-        for ws in wb.worksheets:
+        for hoja_nombre in wb.sheet_names:
             # 1) Nombre de la hoja
-            hoja_nombre = ws.title
+            ws = wb.get_sheet_by_name(hoja_nombre)
+            
+            # Recorrer la hoja una sola vez: título, encabezados y luego los datos
+            # skip_empty_area=False mantiene las filas y columnas alineadas desde A1
+            rows = map(normalize_row, ws.to_python(skip_empty_area=False))
+            # Las celdas con error se devuelven con su texto, igual que openpyxl
+            errors = errors_by_sheet.get(hoja_nombre)
+            if errors:
+                rows = apply_error_cells(rows, errors)
             
             # 2) Título (asumimos que está en la celda A1, fila 1, col 1)
-            title_cell = ws.cell(row=1, column=1).value
+            title_row = next(rows, ())
+            title_cell = title_row[0] if title_row else None
             # Evitar error si la celda está vacía
             title_value = title_cell if title_cell else ""
             
             # 3) Leer los encabezados (fila 2)
-            headers = []
-            col = 1
-            while True:
-                cell_value = ws.cell(row=2, column=col).value
-                if cell_value is None:
-                    # Se asume que cuando ya no hay encabezado, se termina
-                    break
-                headers.append(cell_value)
-                col += 1
+            # Se asume que cuando ya no hay encabezado, se termina
+            headers = list(takewhile(lambda value: value is not None, next(rows, ())))
             
             # 4) Reconstruir column_widths 
             #    (mapeando cada "header" a su ancho de columna, si existe)
             column_widths = {}
+            sheet_widths = widths_by_sheet.get(hoja_nombre, {})
             for idx, header in enumerate(headers, start=1):
-                column_letter = get_column_letter(idx)
                 # Puede retornar None si la columna no tiene ancho asignado explícitamente
-                col_width = ws.column_dimensions[column_letter].width
+                col_width = sheet_widths.get(idx)
                 # Si no hubiera ancho establecido, coloca un valor por defecto
                 column_widths[header] = col_width if col_width else 10.0
             
             # 5) Leer los datos desde la fila 3 en adelante
-            data = []
-            row_num = 3
-            while True:
-                # Detectar si la fila ya no tiene datos
-                # Se hace revisando si en la columna 1 ya no hay nada
-                first_col_value = ws.cell(row=row_num, column=1).value
-                if first_col_value is None:
-                    # Podrías refinar la condición para datos esparcidos, 
-                    # pero se asume que si la primera columna está vacía, se acabaron los datos
-                    break
-                
-                # Construir el diccionario para la fila
-                row_dict = {}
-                for col_idx, header in enumerate(headers, start=1):
-                    cell_value = ws.cell(row=row_num, column=col_idx).value
-                    row_dict[header] = cell_value
-                data.append(row_dict)
-                row_num += 1
+            # Detectar si la fila ya no tiene datos
+            # Se hace revisando si en la columna 1 ya no hay nada
+            # Podrías refinar la condición para datos esparcidos, 
+            # pero se asume que si la primera columna está vacía, se acabaron los datos
+            # Las filas vienen completas hasta la última columna de la hoja, zip las recorta a los encabezados
+            data = [dict(zip(headers, row)) for row in takewhile(lambda row: row and row[0] is not None, rows)]
             
             # 6) Armar la estructura tipo SheetData
             sheet_info = {
@@ -188,12 +661,17 @@ async def excel_a_json(file: UploadFile = File(...)):
             
             hojas_data.append(sheet_info)
         
+        # Liberar el libro cargado
+        wb.close()
+        
         # 7) Retornar la respuesta en la misma estructura que ExcelRequest
         response = {
             "hojas": hojas_data
         }
         
-        return JSONResponse(content=response, status_code=200)
+        return OrjsonResponse(content=response, status_code=200)
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    # Un archivo dañado o que no es un libro de Excel es un error de la solicitud
+    # Cualquier otro error lo atiende el manejador global
+    except (CalamineError, BadZipFile, ElementTree.ParseError, KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="El archivo proporcionado no es un Excel válido.")
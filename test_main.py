@@ -0,0 +1,269 @@
+from io import BytesIO
+from zipfile import ZipFile
+
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+client = TestClient(app)
+
+# Estilos para los libros escritos a mano: el estilo 1 es una duración ([h]:mm)
+FIXTURE_STYLES_XML = (
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="[h]:mm"/></numFmts>'
+    '<fonts count="1"><font/></fonts><fills count="1"><fill/></fills><borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0"/><xf numFmtId="164" applyNumberFormat="1"/></cellXfs>'
+    '</styleSheet>'
+)
+
+
+def fixture_workbook(sheet_data):
+    """
+    Arma un libro de una hoja ("Hoja1") con el XML de sus filas escrito a mano,
+    para probar la lectura con celdas que /crear-excel no genera.
+    """
+    buffer = BytesIO()
+    with ZipFile(buffer, "w") as archive:
+        archive.writestr("[Content_Types].xml", main.CONTENT_TYPES_XML.format(
+            sheets=main.CONTENT_TYPE_SHEET_XML.format(idx=1), shared_strings=""))
+        archive.writestr("_rels/.rels", main.ROOT_RELS_XML)
+        archive.writestr("xl/workbook.xml", main.WORKBOOK_XML.format(
+            sheets=main.WORKBOOK_SHEET_XML.format(name='"Hoja1"', idx=1), filters=""))
+        archive.writestr("xl/_rels/workbook.xml.rels", main.WORKBOOK_RELS_XML.format(
+            sheets=main.WORKBOOK_SHEET_REL_XML.format(idx=1), styles_id=2, shared_strings=""))
+        archive.writestr("xl/styles.xml", FIXTURE_STYLES_XML)
+        archive.writestr("xl/worksheets/sheet1.xml", (
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f'<sheetData>{sheet_data}</sheetData></worksheet>'
+        ))
+    return buffer.getvalue()
+
+
+def read_back(content):
+    """
+    Lee un libro con /excel-a-json y devuelve sus hojas.
+    """
+    response = client.post("/excel-a-json", files={"file": ("libro.xlsx", content)})
+    assert response.status_code == 200, response.text
+    return response.json()["hojas"]
+
+
+def test_roundtrip_large_numbers():
+    payload = {"hojas": [{
+        "hoja": "Numeros",
+        "title": "Reporte",
+        "column_widths": {"Valor": 10},
+        "data": [{"Valor": 1e20}, {"Valor": -1e300}, {"Valor": 2 ** 53}, {"Valor": 42}, {"Valor": 1.5}],
+    }]}
+    created = client.post("/crear-excel", json=payload)
+    assert created.status_code == 200, created.text
+    
+    values = [row["Valor"] for row in read_back(created.content)[0]["data"]]
+    assert values == [1e20, -1e300, 2.0 ** 53, 42, 1.5]
+    assert isinstance(values[3], int)
+
+
+def test_roundtrip_column_widths():
+    payload = {"hojas": [{
+        "hoja": "Anchos",
+        "title": "Reporte",
+        "column_widths": {"Producto": 10, "Precio": 15.5},
+        "data": [{"Producto": "Manzanas", "Precio": 1.5}],
+    }]}
+    created = client.post("/crear-excel", json=payload)
+    assert created.status_code == 200, created.text
+    
+    # El ancho leído debe ser el mismo que se envió, sin crecer en cada ida y vuelta
+    hoja = read_back(created.content)[0]
+    assert hoja["column_widths"] == {"Producto": 10, "Precio": 15.5}
+    payload["hojas"][0]["column_widths"] = hoja["column_widths"]
+    recreated = client.post("/crear-excel", json=payload)
+    assert read_back(recreated.content)[0]["column_widths"] == {"Producto": 10, "Precio": 15.5}
+
+
+def test_read_large_number_title_and_header():
+    # Título y encabezado numéricos, que /crear-excel no genera (ahí son textos)
+    content = fixture_workbook(
+        '<row r="1"><c r="A1"><v>1E+20</v></c></row>'
+        '<row r="2"><c r="A2"><v>1E+20</v></c></row>'
+        '<row r="3"><c r="A3"><v>7</v></c></row>'
+    )
+    hoja = read_back(content)[0]
+    
+    assert hoja["title"] == 1e20
+    # orjson serializa la clave numérica como texto
+    assert len(hoja["column_widths"]) == 1
+    assert [list(row.values()) for row in hoja["data"]] == [[7]]
+
+
+def test_openapi_documents_crear_excel_body():
+    schema = client.get("/openapi.json").json()
+    
+    body = schema["paths"]["/crear-excel"]["post"]["requestBody"]
+    assert body["required"] is True
+    assert body["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/ExcelRequest"}
+    sheet = schema["components"]["schemas"]["SheetData"]
+    assert sheet["properties"]["hoja"]["examples"] == ["Reporte1"]
+
+
+def test_read_duration_cells():
+    content = fixture_workbook(
+        '<row r="1"><c r="A1" t="inlineStr"><is><t>Turnos</t></is></c></row>'
+        '<row r="2"><c r="A2" t="inlineStr"><is><t>Horas</t></is></c></row>'
+        '<row r="3"><c r="A3" s="1"><v>1.25</v></c></row>'
+    )
+    
+    # Las duraciones se devuelven en segundos
+    assert read_back(content)[0]["data"] == [{"Horas": 108000.0}]
+
+
+def test_read_error_cells():
+    content = fixture_workbook(
+        '<row r="1"><c r="A1" t="inlineStr"><is><t>Reporte</t></is></c></row>'
+        '<row r="2"><c r="A2" t="inlineStr"><is><t>Producto</t></is></c><c r="B2" t="inlineStr"><is><t>Precio</t></is></c></row>'
+        '<row r="3"><c r="A3" t="inlineStr"><is><t>Manzanas</t></is></c><c r="B3" t="e"><v>#DIV/0!</v></c></row>'
+        '<row r="4"><c r="A4" t="e"><v>#N/A</v></c><c r="B4"><v>2</v></c></row>'
+        '<row r="5"><c r="A5" t="inlineStr"><is><t>Peras</t></is></c><c r="B5"><v>3</v></c></row>'
+    )
+    
+    # Las celdas con error se devuelven con su texto y un error en la columna A no corta los datos
+    assert read_back(content)[0]["data"] == [
+        {"Producto": "Manzanas", "Precio": "#DIV/0!"},
+        {"Producto": "#N/A", "Precio": 2},
+        {"Producto": "Peras", "Precio": 3},
+    ]
+
+
+def test_roundtrip_equals_sign_text():
+    payload = {"hojas": [{
+        "hoja": "Signos",
+        "title": "Reporte",
+        "column_widths": {"Signo": 10},
+        "data": [{"Signo": "="}, {"Signo": "fin"}],
+    }]}
+    created = client.post("/crear-excel", json=payload)
+    assert created.status_code == 200, created.text
+    
+    # Un "=" solo es texto, no una fórmula vacía
+    assert read_back(created.content)[0]["data"] == [{"Signo": "="}, {"Signo": "fin"}]
+
+
+def test_roundtrip_data_rows():
+    payload = {"hojas": [{
+        "hoja": "Filas",
+        "title": "Reporte",
+        "column_widths": {"Producto": 20, "Cantidad": 15, "Precio": 15},
+        # data_rows tiene prioridad sobre data
+        "data": [{"Producto": "Ignorado", "Cantidad": 0, "Precio": 0}],
+        "data_rows": [
+            ["Manzanas", 50, 1.5],
+            ["Naranjas", 30],                   # fila más corta que los encabezados
+            ["Peras", None, 2.0],               # valor nulo
+            ["Uvas", 10, 3.0, "sobrante"],      # fila más larga que los encabezados
+        ],
+    }]}
+    created = client.post("/crear-excel", json=payload)
+    assert created.status_code == 200, created.text
+    
+    assert read_back(created.content)[0]["data"] == [
+        {"Producto": "Manzanas", "Cantidad": 50, "Precio": 1.5},
+        {"Producto": "Naranjas", "Cantidad": 30, "Precio": None},
+        {"Producto": "Peras", "Cantidad": None, "Precio": 2.0},
+        {"Producto": "Uvas", "Cantidad": 10, "Precio": 3.0},
+    ]
+
+
+def test_unexpected_error_keeps_cors_headers(monkeypatch):
+    def fail(*args):
+        raise RuntimeError("fallo interno")
+    monkeypatch.setattr(main, "build_workbook", fail)
+    payload = {"hojas": [{"hoja": "Hoja1", "title": "Reporte", "column_widths": {"A": 10}}]}
+    response = client.post("/crear-excel", json=payload, headers={"Origin": "https://ejemplo.com"})
+    
+    # El 500 genérico también lleva los encabezados de CORS
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Error interno del servidor."}
+    assert response.headers["access-control-allow-origin"]
+
+
+def crear_excel_hojas(*hojas):
+    """
+    Envía las hojas a /crear-excel y devuelve la respuesta.
+    """
+    return client.post("/crear-excel", json={"hojas": [
+        {"title": "Reporte", "column_widths": {"A": 10}, **hoja} for hoja in hojas
+    ]})
+
+
+def test_crear_excel_empty_sheets():
+    response = client.post("/crear-excel", json={"hojas": []})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "La lista de hojas está vacía."}
+
+
+def test_crear_excel_invalid_json():
+    response = client.post("/crear-excel", content=b'{"hojas": [', headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_crear_excel_duplicate_sheet_name():
+    response = crear_excel_hojas({"hoja": "Ventas"}, {"hoja": "VENTAS"})
+    assert response.status_code == 400
+    assert "repetido" in response.json()["detail"]
+
+
+def test_crear_excel_invalid_sheet_name():
+    response = crear_excel_hojas({"hoja": "Ventas/2024"})
+    assert response.status_code == 400
+    assert "caracteres no permitidos" in response.json()["detail"]
+
+
+def test_crear_excel_nested_cell_value():
+    for value in ([1, 2], {"x": 1}):
+        response = crear_excel_hojas({"hoja": "Ventas", "data": [{"A": value}]})
+        assert response.status_code == 400
+        assert "Tipo de dato no soportado" in response.json()["detail"]
+
+
+def test_excel_a_json_not_xlsx():
+    # Extensión que no es de Excel
+    response = client.post("/excel-a-json", files={"file": ("datos.csv", b"a,b\n1,2\n")})
+    assert response.status_code == 400
+    # Extensión de Excel pero contenido que no es un libro
+    response = client.post("/excel-a-json", files={"file": ("datos.xlsx", b"no es un zip")})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "El archivo proporcionado no es un Excel válido."}
+
+
+def test_shared_strings_match_inline_strings():
+    payload = {"hojas": [
+        {
+            "hoja": "Ventas",
+            "title": "Reporte",
+            "column_widths": {"Producto": 20, "Nota": 15},
+            "data": [{"Producto": "Manzanas", "Nota": "  con espacios  "}, {"Producto": "Peras", "Nota": "Manzanas"}],
+        },
+        {
+            # Textos y encabezados repetidos entre las dos hojas
+            "hoja": "Compras",
+            "title": "Reporte",
+            "column_widths": {"Producto": 20, "Nota": 15},
+            "data": [{"Producto": "Manzanas", "Nota": " inicio"}, {"Producto": "Peras", "Nota": "fin "}],
+        },
+    ]}
+    inline = client.post("/crear-excel", json=payload)
+    shared = client.post("/crear-excel?inline_strings=false", json=payload)
+    assert inline.status_code == 200, inline.text
+    assert shared.status_code == 200, shared.text
+    
+    with ZipFile(BytesIO(shared.content)) as archive:
+        assert "xl/sharedStrings.xml" in archive.namelist()
+    with ZipFile(BytesIO(inline.content)) as archive:
+        assert "xl/sharedStrings.xml" not in archive.namelist()
+    
+    hojas = read_back(shared.content)
+    assert hojas == read_back(inline.content)
+    assert hojas[0]["data"][0] == {"Producto": "Manzanas", "Nota": "  con espacios  "}
+    assert hojas[1]["data"] == [{"Producto": "Manzanas", "Nota": " inicio"}, {"Producto": "Peras", "Nota": "fin "}]